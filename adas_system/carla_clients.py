@@ -1,15 +1,66 @@
 import carla
-import time
+from carla import command
+import math
 import random
+import threading
+# numpy is reserved for array code (camera frames); use math for scalar math
 import numpy as np
-from typing import List, Dict, Optional
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional, Tuple
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class VehicleState:
+    """Flat vehicle kinematics: location, rotation (pitch, yaw, roll), velocity and acceleration."""
+    __slots__ = ('lx', 'ly', 'lz', 'rp', 'ry', 'rr', 'vx', 'vy', 'vz', 'ax', 'ay', 'az')
+    
+    def __init__(self):
+        self.lx = self.ly = self.lz = 0.0
+        self.rp = self.ry = self.rr = 0.0
+        self.vx = self.vy = self.vz = 0.0
+        self.ax = self.ay = self.az = 0.0
+    
+    @property
+    def speed(self) -> float:
+        """Speed in m/s."""
+        return math.hypot(self.vx, self.vy, self.vz)
+
+# carla.Client connections shared by every CarlaClient in this process, keyed by
+# (host, port, timeout) so a client's timeout never changes under another instance
+_POOL: Dict[Tuple[str, int, float], carla.Client] = {}
+
+def close_pool():
+    """Drop all pooled connections, e.g. on test teardown."""
+    _POOL.clear()
+
+@dataclass(slots=True)
+class SensorSet:
+    """Fixed set of sensor actors attached to the ego vehicle."""
+    camera: Any = None
+    imu: Any = None
+    gps: Any = None
+
 class CarlaClient:
+    WEATHER_PRESETS = {
+        "ClearNoon": carla.WeatherParameters.ClearNoon,
+        "CloudyNoon": carla.WeatherParameters.CloudyNoon,
+        "WetNoon": carla.WeatherParameters.WetNoon,
+        "WetCloudyNoon": carla.WeatherParameters.WetCloudyNoon,
+        "MidRainyNoon": carla.WeatherParameters.MidRainyNoon,
+        "HardRainNoon": carla.WeatherParameters.HardRainNoon,
+        "SoftRainNoon": carla.WeatherParameters.SoftRainNoon,
+        "ClearSunset": carla.WeatherParameters.ClearSunset,
+        "CloudySunset": carla.WeatherParameters.CloudySunset,
+        "WetSunset": carla.WeatherParameters.WetSunset,
+        "WetCloudySunset": carla.WeatherParameters.WetCloudySunset,
+        "MidRainSunset": carla.WeatherParameters.MidRainSunset,
+        "HardRainSunset": carla.WeatherParameters.HardRainSunset,
+        "SoftRainSunset": carla.WeatherParameters.SoftRainSunset,
+    }
+    
     def __init__(self, host: str = "localhost", port: int = 2000, timeout: float = 10.0):
         """Initialize Carla client with connection parameters."""
         self.host = host
@@ -18,42 +69,92 @@ class CarlaClient:
         self.client = None
         self.world = None
         self.vehicle = None
-        self.sensors = {}
+        self.sensors = SensorSet()
         self.blueprint_library = None
+        self._bp_cache = {}
+        self._original_settings = None
+        self._tick_callback_id = None
+        self._snapshot = None
+        self._state = VehicleState()
+        self._latest_image = None
+        self._latest_bgra = None
+        self._frame_buf = None
+        self._frame_lock = threading.Lock()
         
     def connect(self) -> bool:
         """Connect to Carla server."""
         try:
-            self.client = carla.Client(self.host, self.port)
-            self.client.set_timeout(self.timeout)
+            key = (self.host, self.port, self.timeout)
+            self.client = _POOL.get(key)
+            if self.client is None:
+                self.client = carla.Client(self.host, self.port)
+                self.client.set_timeout(self.timeout)
+                _POOL[key] = self.client
             self.world = self.client.get_world()
             self.blueprint_library = self.world.get_blueprint_library()
+            self._bp_cache = {bp.id: bp for bp in self.blueprint_library}
             logger.info(f"Connected to Carla server at {self.host}:{self.port}")
+            self._warmup_perception()
             return True
         except Exception as e:
             logger.error(f"Failed to connect to Carla: {e}")
             return False
     
+    def _warmup_perception(self):
+        """JIT-compile the perception kernels ahead of the first sensor frame."""
+        try:
+            # Imported lazily: numba and the perception stack are only needed here.
+            # The package name is required, see drivable_space_estimation.
+            from adas_system.perception.drivable_space_estimation import warmup
+            warmup()
+            logger.info("Perception kernels ready")
+        except Exception as e:
+            logger.warning(f"Failed to warm up perception kernels: {e}")
+    
     def load_world(self, map_name: str = "Town10HD_Opt") -> bool:
         """Load a specific world/map."""
         try:
             self.world = self.client.load_world(map_name)
             self.blueprint_library = self.world.get_blueprint_library()
+            self._bp_cache = {bp.id: bp for bp in self.blueprint_library}
             logger.info(f"Loaded world: {map_name}")
             return True
         except Exception as e:
             logger.error(f"Failed to load world {map_name}: {e}")
             return False
     
+    def enable_synchronous_mode(self, fixed_delta_seconds: float = 0.05) -> bool:
+        """Run the simulation in synchronous, fixed-step mode driven by world.tick()."""
+        try:
+            self._original_settings = self.world.get_settings()
+            settings = self.world.get_settings()
+            settings.synchronous_mode = True
+            settings.fixed_delta_seconds = fixed_delta_seconds
+            self.world.apply_settings(settings)
+            
+            # Autopilot vehicles are driven by the traffic manager, which must follow the same clock
+            self.client.get_trafficmanager().set_synchronous_mode(True)
+            
+            self._tick_callback_id = self.world.on_tick(self._on_tick)
+            logger.info(f"Synchronous mode enabled (fixed_delta_seconds={fixed_delta_seconds})")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to enable synchronous mode: {e}")
+            return False
+    
+    def _on_tick(self, snapshot: carla.WorldSnapshot):
+        """Keep the latest world snapshot so state reads need no extra RPCs."""
+        self._snapshot = snapshot
+    
     def spawn_vehicle(self, vehicle_model: str = "vehicle.mini.cooper", 
                      spawn_point: Optional[carla.Transform] = None) -> bool:
         """Spawn a vehicle at specified location or random location."""
         try:
             # Get vehicle blueprint
-            vehicle_bp = self.blueprint_library.find(vehicle_model)
+            vehicle_bp = self._bp_cache.get(vehicle_model)
             if not vehicle_bp:
                 logger.warning(f"Vehicle {vehicle_model} not found, using default")
-                vehicle_bp = self.blueprint_library.find("vehicle.mini.cooper")
+                vehicle_bp = self._bp_cache["vehicle.mini.cooper"]
             
             # Set spawn point
             if spawn_point is None:
@@ -77,36 +178,54 @@ class CarlaClient:
         
         try:
             # Camera sensor
-            camera_bp = self.blueprint_library.find('sensor.camera.rgb')
-            camera_bp.set_attribute('image_size_x', '1920')
-            camera_bp.set_attribute('image_size_y', '1080')
+            camera_bp = self._bp_cache['sensor.camera.rgb']
+            image_width, image_height = 1920, 1080
+            camera_bp.set_attribute('image_size_x', str(image_width))
+            camera_bp.set_attribute('image_size_y', str(image_height))
             camera_bp.set_attribute('fov', '90')
             
             camera_location = carla.Location(x=2.0, z=1.4)
             camera_rotation = carla.Rotation(pitch=-15)
             camera_transform = carla.Transform(camera_location, camera_rotation)
             
-            camera = self.world.spawn_actor(camera_bp, camera_transform, attach_to=self.vehicle)
-            self.sensors['camera'] = camera
-            logger.info("Camera sensor setup complete")
-            
             # IMU sensor
-            imu_bp = self.blueprint_library.find('sensor.other.imu')
+            imu_bp = self._bp_cache['sensor.other.imu']
             imu_location = carla.Location(x=0.0, z=0.0)
             imu_transform = carla.Transform(imu_location)
             
-            imu = self.world.spawn_actor(imu_bp, imu_transform, attach_to=self.vehicle)
-            self.sensors['imu'] = imu
-            logger.info("IMU sensor setup complete")
-            
             # GPS sensor
-            gps_bp = self.blueprint_library.find('sensor.other.gnss')
+            gps_bp = self._bp_cache['sensor.other.gnss']
             gps_location = carla.Location(x=0.0, z=0.0)
             gps_transform = carla.Transform(gps_location)
             
-            gps = self.world.spawn_actor(gps_bp, gps_transform, attach_to=self.vehicle)
-            self.sensors['gps'] = gps
-            logger.info("GPS sensor setup complete")
+            # Spawn all sensors in a single round-trip to the server
+            sensor_specs = [
+                ('camera', camera_bp, camera_transform),
+                ('imu', imu_bp, imu_transform),
+                ('gps', gps_bp, gps_transform),
+            ]
+            batch = [command.SpawnActor(bp, transform, self.vehicle.id)
+                     for _, bp, transform in sensor_specs]
+            results = self.client.apply_batch_sync(batch, False)
+            
+            spawned_ids = {}
+            for (sensor_name, _, _), result in zip(sensor_specs, results):
+                if result.error:
+                    logger.error(f"Failed to spawn {sensor_name} sensor: {result.error}")
+                else:
+                    spawned_ids[sensor_name] = result.actor_id
+            
+            actors = self.world.get_actors(list(spawned_ids.values()))
+            for sensor_name, actor_id in spawned_ids.items():
+                setattr(self.sensors, sensor_name, actors.find(actor_id))
+                logger.info(f"{sensor_name.upper()} sensor setup complete")
+            
+            if len(spawned_ids) != len(sensor_specs):
+                return False
+            
+            # Stable copy target for camera frames, allocated once and reused
+            self._frame_buf = np.empty((image_height, image_width, 4), dtype=np.uint8)
+            self.sensors.camera.listen(self._on_camera)
             
             return True
             
@@ -114,27 +233,31 @@ class CarlaClient:
             logger.error(f"Failed to setup sensors: {e}")
             return False
     
+    def _on_camera(self, image: carla.Image):
+        """Wrap the raw BGRA camera buffer as an array view without copying.
+        
+        Runs on the sensor thread. raw_data does not keep the image alive, so the
+        image is held alongside the view until the next frame replaces it.
+        """
+        bgra = np.frombuffer(image.raw_data, dtype=np.uint8).reshape(
+            (image.height, image.width, 4))
+        with self._frame_lock:
+            self._latest_image = image
+            self._latest_bgra = bgra
+    
+    def get_latest_frame(self) -> Optional[np.ndarray]:
+        """Copy the latest camera frame (BGRA) into the reusable frame buffer and return it."""
+        with self._frame_lock:
+            if self._latest_bgra is None:
+                return None
+            np.copyto(self._frame_buf, self._latest_bgra)
+        return self._frame_buf
+    
     def set_weather(self, weather_type: str = "ClearNoon"):
         """Set weather conditions."""
-        weather_presets = {
-            "ClearNoon": carla.WeatherParameters.ClearNoon,
-            "CloudyNoon": carla.WeatherParameters.CloudyNoon,
-            "WetNoon": carla.WeatherParameters.WetNoon,
-            "WetCloudyNoon": carla.WeatherParameters.WetCloudyNoon,
-            "MidRainyNoon": carla.WeatherParameters.MidRainyNoon,
-            "HardRainNoon": carla.WeatherParameters.HardRainNoon,
-            "SoftRainNoon": carla.WeatherParameters.SoftRainNoon,
-            "ClearSunset": carla.WeatherParameters.ClearSunset,
-            "CloudySunset": carla.WeatherParameters.CloudySunset,
-            "WetSunset": carla.WeatherParameters.WetSunset,
-            "WetCloudySunset": carla.WeatherParameters.WetCloudySunset,
-            "MidRainSunset": carla.WeatherParameters.MidRainSunset,
-            "HardRainSunset": carla.WeatherParameters.HardRainSunset,
-            "SoftRainSunset": carla.WeatherParameters.SoftRainSunset,
-        }
-        
-        if weather_type in weather_presets:
-            self.world.set_weather(weather_presets[weather_type])
+        preset = CarlaClient.WEATHER_PRESETS.get(weather_type)
+        if preset is not None:
+            self.world.set_weather(preset)
             logger.info(f"Weather set to: {weather_type}")
         else:
             logger.warning(f"Weather type {weather_type} not found, using ClearNoon")
@@ -151,60 +274,79 @@ class CarlaClient:
         """Apply manual control to the vehicle."""
         if self.vehicle:
             control = carla.VehicleControl()
-            control.throttle = np.clip(throttle, 0.0, 1.0)
-            control.steer = np.clip(steer, -1.0, 1.0)
-            control.brake = np.clip(brake, 0.0, 1.0)
+            # Plain comparisons avoid NumPy dispatch overhead on scalars
+            control.throttle = 0.0 if throttle < 0.0 else (1.0 if throttle > 1.0 else throttle)
+            control.steer = -1.0 if steer < -1.0 else (1.0 if steer > 1.0 else steer)
+            control.brake = 0.0 if brake < 0.0 else (1.0 if brake > 1.0 else brake)
             self.vehicle.apply_control(control)
     
-    def get_vehicle_state(self) -> Dict:
-        """Get current vehicle state information."""
+    def get_vehicle_state(self) -> Optional[VehicleState]:
+        """Get current vehicle state information.
+        
+        Returns the same preallocated VehicleState instance, updated in place on
+        every call, or None if no vehicle is spawned.
+        """
         if not self.vehicle:
-            return {}
+            return None
+        
+        # Read from the last tick's snapshot when available, otherwise query the server
+        actor_snapshot = self._snapshot.find(self.vehicle.id) if self._snapshot else None
+        source = actor_snapshot if actor_snapshot else self.vehicle
         
-        transform = self.vehicle.get_transform()
-        velocity = self.vehicle.get_velocity()
-        acceleration = self.vehicle.get_acceleration()
+        transform = source.get_transform()
+        velocity = source.get_velocity()
+        acceleration = source.get_acceleration()
         
-        return {
-            'location': {
-                'x': transform.location.x,
-                'y': transform.location.y,
-                'z': transform.location.z
-            },
-            'rotation': {
-                'pitch': transform.rotation.pitch,
-                'yaw': transform.rotation.yaw,
-                'roll': transform.rotation.roll
-            },
-            'velocity': {
-                'x': velocity.x,
-                'y': velocity.y,
-                'z': velocity.z
-            },
-            'acceleration': {
-                'x': acceleration.x,
-                'y': acceleration.y,
-                'z': acceleration.z
-            }
-        }
+        location = transform.location
+        rotation = transform.rotation
+        state = self._state
+        state.lx, state.ly, state.lz = location.x, location.y, location.z
+        state.rp, state.ry, state.rr = rotation.pitch, rotation.yaw, rotation.roll
+        state.vx, state.vy, state.vz = velocity.x, velocity.y, velocity.z
+        state.ax, state.ay, state.az = acceleration.x, acceleration.y, acceleration.z
+        return state
     
     def cleanup(self):
         """Clean up all spawned actors."""
         logger.info("Cleaning up Carla actors...")
         
-        # Destroy sensors
-        for sensor_name, sensor in self.sensors.items():
-            if sensor and sensor.is_alive:
-                sensor.destroy()
-                logger.info(f"Destroyed sensor: {sensor_name}")
+        camera = self.sensors.camera
+        if camera and camera.is_alive:
+            camera.stop()
+        with self._frame_lock:
+            self._latest_image = None
+            self._latest_bgra = None
         
-        # Destroy vehicle
+        # Collect sensors and vehicle, then destroy them in a single round-trip
+        actors = []
+        for field in fields(self.sensors):
+            sensor = getattr(self.sensors, field.name)
+            if sensor and sensor.is_alive:
+                actors.append((f"sensor: {field.name}", sensor))
         if self.vehicle and self.vehicle.is_alive:
-            self.vehicle.destroy()
-            logger.info("Destroyed vehicle")
+            actors.append(("vehicle", self.vehicle))
+        
+        if actors:
+            results = self.client.apply_batch_sync(
+                [command.DestroyActor(actor.id) for _, actor in actors], False)
+            for (label, _), result in zip(actors, results):
+                if result.error:
+                    logger.error(f"Failed to destroy {label}: {result.error}")
+                else:
+                    logger.info(f"Destroyed {label}")
         
-        self.sensors.clear()
+        self.sensors = SensorSet()
         self.vehicle = None
+        
+        # Hand the server back in asynchronous mode so it does not wait for our ticks
+        if self._tick_callback_id is not None:
+            self.world.remove_on_tick(self._tick_callback_id)
+            self._tick_callback_id = None
+        if self._original_settings is not None:
+            self.world.apply_settings(self._original_settings)
+            self.client.get_trafficmanager().set_synchronous_mode(False)
+            self._original_settings = None
+        self._snapshot = None
 
 def main():
     """Main function to demonstrate basic Carla setup."""
@@ -236,6 +378,13 @@ def main():
         logger.error("Failed to setup sensors")
         return
     
+    # Step the simulation ourselves at a fixed rate
+    fixed_delta_seconds = 0.05
+    if not client.enable_synchronous_mode(fixed_delta_seconds):
+        logger.error("Failed to enable synchronous mode")
+        client.cleanup()
+        return
+    
     # Enable autopilot for demonstration
     client.enable_autopilot(True)
     
@@ -243,15 +392,20 @@ def main():
         logger.info("Carla setup complete! Vehicle is running with autopilot.")
         logger.info("Press Ctrl+C to stop...")
         
-        # Main loop - keep the simulation running
+        # Main loop - advance the simulation one fixed step at a time
+        ticks_per_log = int(5.0 / fixed_delta_seconds)
+        tick_count = 0
         while True:
-            # Get and log vehicle state every 5 seconds
-            state = client.get_vehicle_state()
-            if state:
-                logger.info(f"Vehicle location: {state['location']}")
-                logger.info(f"Vehicle velocity: {state['velocity']}")
+            client.world.tick()
+            tick_count += 1
             
-            time.sleep(5)
+            # Log vehicle state every 5 simulated seconds
+            if tick_count % ticks_per_log == 0:
+                state = client.get_vehicle_state()
+                if state is not None:
+                    logger.info(f"Vehicle location: ({state.lx:.2f}, {state.ly:.2f}, {state.lz:.2f})")
+                    logger.info(f"Vehicle velocity: ({state.vx:.2f}, {state.vy:.2f}, {state.vz:.2f}), "
+                                f"speed: {state.speed:.2f} m/s")
             
     except KeyboardInterrupt:
         logger.info("Stopping simulation...")
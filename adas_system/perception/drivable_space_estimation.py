@@ -1,8 +1,15 @@
 import numpy as np
 import cv2 
 import matplotlib.pyplot as plt
+from numba import njit, prange
 
-np.random.seed(1)
+# The cache=True kernels below are stored with this module's import name, and a
+# cache written under one name cannot be loaded under another. Only allow the
+# package name, e.g. run entry points with `python -m adas_system.<module>`.
+if __name__ != 'adas_system.perception.drivable_space_estimation':
+    raise ImportError(
+        f"{__name__} must be imported as adas_system.perception.drivable_space_estimation "
+        "so the Numba cache is always loaded under one module name")
 
 """
 What type of data we need
@@ -25,4 +32,116 @@ Drivable Space Estimation Using Semantic Segmentation Output
 
 
 1.2 - Estimating The Ground Plane Using RANSAC to outplay outliers
-"""
\ No newline at end of file
+"""
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def unproject(depth, fx, fy, cx, cy, out_xyz):
+    """
+    1.1 Back-project every pixel of a depth image into the camera frame.
+
+    depth: (H, W) depth in meters
+    fx, fy, cx, cy: camera intrinsics in pixels
+    out_xyz: (H, W, 3) output buffer, allocate once per stream and reuse
+    """
+    for v in prange(depth.shape[0]):
+        for u in range(depth.shape[1]):
+            z = depth[v, u]
+            out_xyz[v, u, 0] = (u - cx) * z / fx
+            out_xyz[v, u, 1] = (v - cy) * z / fy
+            out_xyz[v, u, 2] = z
+    return out_xyz
+
+
+@njit(fastmath=True, cache=True)
+def ransac_plane(xyz, iterations, thresh, rng_seed):
+    """
+    1.2 Fit the ground plane a*x + b*y + c*z + d = 0 with RANSAC.
+
+    xyz: (N, 3) points
+    iterations: number of 3-point hypotheses to score
+    thresh: max point-to-plane distance (meters) for an inlier
+    rng_seed: seed for the sampling, so results are reproducible
+
+    Returns the best (a, b, c, d) with unit normal and its inlier count.
+    """
+    np.random.seed(rng_seed)
+    n = xyz.shape[0]
+    best_inliers = 0
+    best_plane = (0.0, 0.0, 0.0, 0.0)
+    for _ in range(iterations):
+        i = np.random.randint(n)
+        j = np.random.randint(n)
+        k = np.random.randint(n)
+
+        # Normal of the plane through the three samples
+        e1x = xyz[j, 0] - xyz[i, 0]
+        e1y = xyz[j, 1] - xyz[i, 1]
+        e1z = xyz[j, 2] - xyz[i, 2]
+        e2x = xyz[k, 0] - xyz[i, 0]
+        e2y = xyz[k, 1] - xyz[i, 1]
+        e2z = xyz[k, 2] - xyz[i, 2]
+        nx = e1y * e2z - e1z * e2y
+        ny = e1z * e2x - e1x * e2z
+        nz = e1x * e2y - e1y * e2x
+        norm = np.sqrt(nx * nx + ny * ny + nz * nz)
+        if norm == 0.0:
+            # Degenerate (collinear or repeated) sample
+            continue
+        nx /= norm
+        ny /= norm
+        nz /= norm
+        d = -(nx * xyz[i, 0] + ny * xyz[i, 1] + nz * xyz[i, 2])
+
+        inliers = 0
+        for p in range(n):
+            dist = abs(nx * xyz[p, 0] + ny * xyz[p, 1] + nz * xyz[p, 2] + d)
+            if dist < thresh:
+                inliers += 1
+
+        if inliers > best_inliers:
+            best_inliers = inliers
+            best_plane = (nx, ny, nz, d)
+    return best_plane, best_inliers
+
+
+def ransac_plane_numpy(xyz, iterations, thresh, rng_seed, chunk_size=65536):
+    """
+    NumPy alternative to ransac_plane, scoring all hypotheses at once.
+
+    Takes the same arguments and returns the same ((a, b, c, d), inliers)
+    shape as ransac_plane. It draws its samples from a different random
+    stream, so for the same seed the two can pick different hypotheses
+    and return slightly different planes.
+
+    Residuals for all hypotheses come from one matmul per chunk of
+    chunk_size points, which bounds the (chunk_size, iterations) temporary.
+    """
+    rng = np.random.default_rng(rng_seed)
+    n = xyz.shape[0]
+    samples = xyz[rng.integers(0, n, size=(iterations, 3))]
+    normals = np.cross(samples[:, 1] - samples[:, 0], samples[:, 2] - samples[:, 0])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Degenerate samples give NaN normals, which never count as inliers
+        normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    d = -np.einsum('ki,ki->k', normals, samples[:, 0])
+
+    inliers = np.zeros(iterations, dtype=np.int64)
+    for start in range(0, n, chunk_size):
+        residuals = np.abs(xyz[start:start + chunk_size] @ normals.T + d)
+        inliers += (residuals < thresh).sum(axis=0)
+
+    best = int(inliers.argmax())
+    if inliers[best] == 0:
+        return (0.0, 0.0, 0.0, 0.0), 0
+    nx, ny, nz = normals[best]
+    return (float(nx), float(ny), float(nz), float(d[best])), int(inliers[best])
+
+
+def warmup():
+    """
+    Compile (or load from the on-disk cache) the kernels above on tiny inputs,
+    so the JIT cost is paid before the first real frame arrives.
+    """
+    xyz = unproject(np.zeros((2, 2), np.float32), 1.0, 1.0, 1.0, 1.0, np.zeros((2, 2, 3), np.float32))
+    ransac_plane(xyz.reshape(-1, 3), 1, 0.1, 0)
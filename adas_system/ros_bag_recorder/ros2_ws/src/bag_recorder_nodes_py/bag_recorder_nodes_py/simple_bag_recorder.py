@@ -24,18 +24,36 @@ class SimpleBagRecorder(Node):
             serialization_format='cdr')
         self.writer.create_topic(topic_info)
 
+        # retained to prevent GC of subscription handle
         self.subscription = self.create_subscription(
             String,
             'chatter',
             self.topic_callback,
             10)
-        self.subscription
+
+        # Bind hot-path callables once to skip attribute lookups per message
+        self._write = self.writer.write
+        self._clock = self.get_clock()
+        self._serialize = serialize_message
+
+        # Batch writes: flush every _buf_limit messages or _flush_period_s
+        self._buf = []
+        self._buf_limit = 64
+        self._flush_period_s = 1.0
+        self._flush_timer = self.create_timer(self._flush_period_s, self.flush)
+        self.context.on_shutdown(self.flush)
 
     def topic_callback(self, msg):
-        self.writer.write(
-            'chatter',
-            serialize_message(msg),
-            self.get_clock().now().nanoseconds)
+        self._buf.append(
+            (self._serialize(msg), self._clock.now().nanoseconds))
+        if len(self._buf) >= self._buf_limit:
+            self.flush()
+
+    def flush(self):
+        write = self._write
+        for data, timestamp in self._buf:
+            write('chatter', data, timestamp)
+        self._buf.clear()
 
 
 def main(args=None):
@@ -2,12 +2,32 @@
 This script plots the spawnpoints and the road networks for pre-route planning.
 
 Designed for Town10 in Carla 0.10.0
+
+By default the plot is rendered headless and saved as <map name>.png.
+Pass --interactive to open it in a window instead.
 """
 
+import argparse
 import carla
+import numpy as np
+import matplotlib as mpl
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--interactive', action='store_true', help='show the plot in a window instead of saving it')
+    args = parser.parse_args()
+
+    # Render off-screen unless a window was asked for
+    if not args.interactive:
+        mpl.use('Agg')
+
+    # Simplify long paths and draw them in chunks to keep rendering cheap
+    mpl.rcParams['path.simplify'] = True
+    mpl.rcParams['path.simplify_threshold'] = 1.0
+    mpl.rcParams['agg.path.chunksize'] = 10000
+
     try:
         client = carla.Client('localhost', 2000)
         client.set_timeout(10.0) 
@@ -22,38 +42,39 @@ def main():
         topology = carla_map.get_topology()
         spawn_points = carla_map.get_spawn_points()
 
-        road_lines = []
-        for waypoint_pair in topology:
-            start_point = waypoint_pair[0].transform.location
-            end_point = waypoint_pair[1].transform.location
-            road_lines.append([
-                (start_point.x, start_point.y), 
-                (end_point.x, end_point.y)
-            ])
+        # (N, 2, 2) array of segments: [start, end] x [x, y]
+        road_segments = np.empty((len(topology), 2, 2), dtype=np.float32)
+        for i, (start_wp, end_wp) in enumerate(topology):
+            # Each .transform builds a new Python object, so fetch each location once
+            start_point = start_wp.transform.location
+            end_point = end_wp.transform.location
+            road_segments[i, 0, 0] = start_point.x
+            road_segments[i, 0, 1] = start_point.y
+            road_segments[i, 1, 0] = end_point.x
+            road_segments[i, 1, 1] = end_point.y
 
-        spawn_point_coords = []
-        for sp_transform in spawn_points:
-            loc = sp_transform.location
-            spawn_point_coords.append((loc.x, loc.y))
+        sp_xy = np.fromiter(
+            (v for sp in spawn_points for v in (sp.location.x, sp.location.y)),
+            dtype=np.float32,
+            count=2 * len(spawn_points),
+        ).reshape(-1, 2)
 
         fig, ax = plt.subplots(figsize=(20, 20))
 
         print("Plotting road network...")
-        for line in road_lines:
-            (x1, y1), (x2, y2) = line
-            ax.plot([x1, x2], [y1, y2], color='gray', linestyle='-', linewidth=0.5)
+        # Single artist for all segments instead of one Line2D per segment
+        ax.add_collection(LineCollection(road_segments, colors='gray', linestyles='-', linewidths=0.5))
+        ax.autoscale_view()
 
         # Plot all spawn points as large red dots
         print(f"Plotting {len(spawn_points)} spawn points...")
-        sp_x, sp_y = zip(*spawn_point_coords)
-        ax.scatter(sp_x, sp_y, color='red', s=50, label='Spawn Points', zorder=5)
+        ax.scatter(sp_xy[:, 0], sp_xy[:, 1], color='red', s=50, label='Spawn Points', zorder=5)
 
         # Add index labels for each spawnpoint
         print("Adding index labels to spawn points...")
-        for i, coords in enumerate(spawn_point_coords):
-            x, y = coords
+        for i, (x, y) in enumerate(sp_xy):
             ax.text(x + 5, y + 5, str(i), fontsize=9, color='darkblue', zorder=6,
-                    ha='center', va='center', weight='bold')
+                    ha='center', va='center', weight='bold', clip_on=True)
 
         ax.set_title(f'CARLA Map: {carla_map.name} - Road Network & Spawn Points with Indices', fontsize=20)
         ax.set_xlabel('X (meters)', fontsize=14)
@@ -65,8 +86,13 @@ def main():
         
         ax.invert_yaxis()
 
-        print("Displaying map plot. Close the plot window to exit the script.")
-        plt.show()
+        if args.interactive:
+            print("Displaying map plot. Close the plot window to exit the script.")
+            plt.show()
+        else:
+            output_path = f'{carla_map.name.split("/")[-1]}.png'
+            fig.savefig(output_path, dpi=150, bbox_inches='tight')
+            print(f"Saved map plot to {output_path}")
 
     except Exception as e:
         print(f"\nAn error occurred: {e}")
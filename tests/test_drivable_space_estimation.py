@@ -0,0 +1,58 @@
+import numpy as np
+
+from adas_system.perception.drivable_space_estimation import (
+    ransac_plane,
+    ransac_plane_numpy,
+    unproject,
+)
+
+
+def _synthetic_road_cloud(width=640, height=480, cam_height=1.4, outlier_ratio=0.2, seed=0):
+    """
+    Point cloud of a flat road seen by a level pinhole camera cam_height above it,
+    with a fraction of pixels replaced by random obstacle depths.
+    """
+    rng = np.random.default_rng(seed)
+    f = width / 2.0
+    cx, cy = width / 2.0, height / 2.0
+    rows = np.arange(height, dtype=np.float32)[:, None] - cy
+    with np.errstate(divide='ignore'):
+        # Ground y = cam_height in the camera frame (y down); rows at/above the horizon see sky
+        depth = np.where(rows > 0, cam_height * f / rows, 1000.0)
+    depth = np.broadcast_to(depth, (height, width)).astype(np.float32)
+    depth = depth + rng.normal(0.0, 0.005, depth.shape).astype(np.float32)
+    outliers = rng.random(depth.shape) < outlier_ratio
+    depth[outliers] = rng.uniform(1.0, 80.0, outliers.sum())
+    xyz = unproject(depth, f, f, cx, cy, np.empty((height, width, 3), np.float32)).reshape(-1, 3)
+    # Drop sky and far-range returns like a real depth pipeline would
+    return np.ascontiguousarray(xyz[xyz[:, 2] < 100.0])
+
+
+def test_unproject_pinhole():
+    depth = np.full((4, 5), 2.0, np.float32)
+    out = unproject(depth, 1.0, 1.0, 2.0, 1.5, np.empty((4, 5, 3), np.float32))
+    np.testing.assert_allclose(out[0, 0], (-4.0, -3.0, 2.0))
+    np.testing.assert_allclose(out[3, 4], (4.0, 3.0, 2.0))
+
+
+def test_ransac_implementations_agree_on_road_plane():
+    xyz = _synthetic_road_cloud()
+    plane_nb, inliers_nb = ransac_plane(xyz, 100, 0.05, 1)
+    plane_np, inliers_np = ransac_plane_numpy(xyz, 100, 0.05, 1)
+
+    # Both must find the road (normal along camera y, 1.4 m below)
+    for a, b, c, d in (plane_nb, plane_np):
+        assert abs(abs(b) - 1.0) < 1e-3
+        assert abs(abs(d) - 1.4) < 0.05
+
+    # Same plane up to the sign of the normal, and close inlier counts
+    sign = np.sign(np.dot(plane_nb[:3], plane_np[:3]))
+    assert abs(np.dot(plane_nb[:3], plane_np[:3])) > 0.999
+    assert abs(sign * plane_nb[3] - plane_np[3]) < 0.05
+    assert abs(inliers_nb - inliers_np) < 0.01 * xyz.shape[0]
+
+
+def test_ransac_plane_numpy_degenerate_input():
+    plane, inliers = ransac_plane_numpy(np.zeros((3, 3), np.float32), 2, 0.1, 0)
+    assert plane == (0.0, 0.0, 0.0, 0.0)
+    assert inliers == 0